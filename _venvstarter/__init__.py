@@ -1,16 +1,10 @@
-import inspect
-import re
-import runpy
+import sys
 from pathlib import Path
 
 from . import errors
 from . import helpers as hp
 from . import python_handler, starter
 
-regexes = {
-    "ascii": re.compile(r"([a-zA-Z]+(0-9)*)+"),
-}
-
 
 class NotSpecified:
     pass
@@ -39,13 +33,14 @@ class manager:
         lives in.
         """
         if here is None:
-            here = Path(inspect.currentframe().f_back.f_code.co_filename).parent.absolute()
+            here = Path(sys._getframe(1).f_code.co_filename).parent.absolute()
 
         self.here = here
         self.program = program
 
         self._env = []
         self._deps = []
+        self._pinned = False
         self._no_binary = []
         self._max_python = None
         self._min_python = None
@@ -105,6 +100,15 @@ class manager:
         self._no_binary.extend(no_binary)
         return self
 
+    def pinned(self, pinned=True):
+        """
+        This will tell pip to install the dependencies without resolving their
+        own dependencies. Every dependency, including transitive dependencies,
+        must be added to the manager when this is used. See :class:`Starter`.
+        """
+        self._pinned = pinned
+        return self
+
     def add_requirements_file(self, *parts):
         """
         This adds a single requirements file. The strings you provide will be
@@ -126,12 +130,12 @@ class manager:
 
             manager(...).add_requirements_file("{here}", "..", "requirements.txt")
         """
-        home = Path.home()
+        home = hp.home()
 
         path = Path(
             *[
                 hp.do_format(
-                    part, here=str(self.here), home=str(home), venv_parent=str(self.venv_folder)
+                    part, here=str(self.here), home=home, venv_parent=str(self.venv_folder)
                 )
                 for part in parts
             ]
@@ -142,11 +146,8 @@ class manager:
                 "Resolved requirements.txt ({parts}) to '{path}' but that does not exist"
             )
 
-        with open(path) as fle:
-            for line in fle:
-                stripped = line.strip()
-                if stripped:
-                    self._deps.append(stripped)
+        lines = (line.strip() for line in path.read_text(encoding="utf-8").splitlines())
+        self._deps.extend(line for line in lines if line)
 
         return self
 
@@ -178,12 +179,12 @@ class manager:
             This is used to tell pip the name of the dependency that is installed
             from this location.
         """
-        home = Path.home()
+        home = hp.home()
 
         path = Path(
             *[
                 hp.do_format(
-                    part, here=str(self.here), home=str(home), venv_parent=str(self.venv_folder)
+                    part, here=str(self.here), home=home, venv_parent=str(self.venv_folder)
                 )
                 for part in parts
             ]
@@ -194,6 +195,8 @@ class manager:
             if isinstance(version_file, str):
                 version_file = [version_file]
 
+            import runpy
+
             location = Path(path, *version_file)
             version = runpy.run_path(location)["VERSION"]
 
@@ -213,7 +216,7 @@ class manager:
 
         just_name_groups = just_name_match.groupdict()
 
-        dep = f"{Path(path).resolve().absolute().as_uri()}?{just_name_groups['version']}#{just_name_groups['name']}"
+        dep = f"{path.resolve().absolute().as_uri()}?{just_name_groups['version']}#{just_name_groups['name']}"
 
         if editable:
             dep = f"-e {dep}"
@@ -238,7 +241,8 @@ class manager:
         it uses ``.venv``.
         """
         if self._venv_folder_name is None:
-            if not isinstance(self.program, str) or not regexes["ascii"].match(self.program):
+            first = self.program[:1] if isinstance(self.program, str) else ""
+            if not (first.isascii() and first.isalpha()):
                 self._venv_folder_name = ".venv"
             else:
                 self._venv_folder_name = f".{self.program}"
@@ -266,6 +270,7 @@ class manager:
             env=self._env,
             deps=self._deps,
             no_binary=self._no_binary,
+            pinned=self._pinned,
             min_python_version=self._min_python,
             max_python_version=self._max_python,
             **(
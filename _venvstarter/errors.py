@@ -1,3 +1,6 @@
+import os
+
+
 class ScriptNotFound(Exception):
     def __init__(self, location, name):
         super().__init__()
@@ -5,9 +8,8 @@ class ScriptNotFound(Exception):
         self.location = location
 
     def __str__(self):
-        available = ", ".join(
-            n.name for n in self.location.parent.iterdir() if "." not in n.name and n.exists()
-        )
+        with os.scandir(self.location.parent) as entries:
+            available = ", ".join(e.name for e in entries if "." not in e.name and e.is_file())
         return "\n".join(
             [
                 "\nCouldn't find the executable!",
@@ -1,21 +1,35 @@
+import functools
+from pathlib import Path
+
+
 class memoized_property(object):
+    """
+    Like functools.cached_property, which python3.7 doesn't have. The value is
+    stored on the instance under the same name so later access skips this
+    descriptor.
+    """
+
     def __init__(self, func):
         self.func = func
-        self.key = f".{self.func.__name__}"
+        self.key = self.func.__name__
 
     def __get__(self, instance, owner):
-        obj = getattr(instance, self.key, None)
-        if obj is None:
-            obj = self.func(instance)
-            setattr(instance, self.key, obj)
+        if instance is None:
+            return self
+        obj = instance.__dict__[self.key] = self.func(instance)
         return obj
 
-    def __set__(self, instance, value):
-        setattr(instance, self.key, value)
+
+def do_format(s, mapping=None, **kwargs):
+    if mapping is None:
+        mapping = kwargs
+    if not isinstance(s, str):
+        s = str(s)
+    if "{" not in s and "}" not in s:
+        return s
+    return s.format_map(mapping)
 
 
-def do_format(s, **kwargs):
-    if hasattr(s, "format"):
-        return s.format(**kwargs)
-    else:
-        return str(s).format(**kwargs)
+@functools.lru_cache(maxsize=None)
+def home():
+    return str(Path.home())
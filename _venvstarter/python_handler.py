@@ -1,32 +1,41 @@
-import json
 import os
 import pathlib
 import re
-import shlex
-import shutil
-import subprocess
 import sys
-import tempfile
-import textwrap
 
 from . import errors
 from . import helpers as hp
 
 regexes = {
     "version_specifier": re.compile(r"([^=><]+)(.*)"),
-    "version_string": re.compile(r"^([^\.]+)(?:\.([^\.]+))?(?:\.([^\.]+))?.*"),
     "name_version_split": re.compile(
         r"^(?P<name>[a-zA-Z0-9][a-zA-Z0-9._-]*(\[[^\]]+\])?)(?P<version>.*)$"
     ),
 }
 
+version_question = 'import sys; print("%d.%d.%d" % sys.version_info[:3])'
+
+# Remembers what each python is across a run so each is only asked once
+# Keyed by the real location and mtime of the executable
+found_versions = {}
+
+# Remembers what shutil.which found, keyed by name and PATH
+found_executables = {}
+
+# Remembers the command each shebang turns into, keyed by the resolved location
+found_shebangs = {}
+
 
 class Version:
     def __init__(self, version, without_patch=False):
-        original = version
+        self.without_patch = without_patch
 
         if isinstance(version, Version):
-            version = str(version)
+            self.major, self.minor = version.major, version.minor
+            self.patch = 0 if without_patch else version.patch
+            return
+
+        original = version
 
         if isinstance(version, (int, float)):
             version = str(version)
@@ -41,16 +50,32 @@ class Version:
         if not isinstance(version, str):
             raise errors.InvalidVersion(original)
 
-        m = regexes["version_string"].match(version)
-        if m is None:
+        parts = []
+        for part in version.split(".", 3)[:3]:
+            if not part:
+                break
+            parts.append(part)
+
+        if not parts:
             raise errors.InvalidVersion(version)
 
-        groups = m.groups()
-        self.major = int(groups[0])
-        self.minor = int(groups[1] or "0")
-        self.patch = int(groups[2] or "0")
+        if len(parts) == 3:
+            # Allow for things like 3.12.0rc1
+            for i, c in enumerate(parts[2]):
+                if not c.isdigit():
+                    parts[2] = parts[2][:i] or "0"
+                    break
+
+        try:
+            numbers = [int(part) for part in parts]
+        except ValueError:
+            raise errors.InvalidVersion(original)
+
+        while len(numbers) < 3:
+            numbers.append(0)
+
+        self.major, self.minor, self.patch = numbers
 
-        self.without_patch = without_patch
         if without_patch:
             self.patch = 0
 
@@ -81,19 +106,22 @@ class Version:
 
     def _cmp(self, other):
         this = self.version
-        other = Version(other).version
+        if isinstance(other, Version):
+            other = other.version
+        elif (
+            isinstance(other, tuple)
+            and 1 <= len(other) <= 3
+            and all(isinstance(part, int) for part in other)
+        ):
+            other = other + (0,) * (3 - len(other))
+        else:
+            other = Version(other).version
 
         if self.without_patch:
             this = this[:2]
             other = other[:2]
 
-        if this != other:
-            if this < other:
-                return -1
-            else:
-                return 1
-
-        return 0
+        return (this > other) - (this < other)
 
 
 class Shebang:
@@ -109,24 +137,33 @@ class Shebang:
             yield from cmd
             return
 
-        with open(pathlib.Path(cmd[0]).resolve()) as fle:
-            try:
-                part = fle.read(2)
-            except UnicodeDecodeError:
-                part = ""
-
-            if part == "#!":
-                shb = fle.readline().strip()
-                if os.name == "nt":
-                    if " " in shb:
-                        if pathlib.Path(shb.split(" ")[0]).name == "env":
-                            shb = shb[shb.find(" ") + 1 :]
-                    yield shb
-                else:
-                    yield from shlex.split(shb)
+        location = pathlib.Path(cmd[0]).resolve()
+        if location.suffix.lower() in (".exe", ".dll"):
+            yield from cmd
+            return
 
+        if location not in found_shebangs:
+            found_shebangs[location] = self.read_shebang(location)
+
+        yield from found_shebangs[location]
         yield from cmd
 
+    def read_shebang(self, location):
+        with open(location, "rb") as fle:
+            if fle.read(2) != b"#!":
+                return ()
+            shb = fle.readline().decode("utf-8", "replace").strip()
+
+        if os.name == "nt":
+            head, _, tail = shb.partition(" ")
+            if tail and pathlib.Path(head).name == "env":
+                shb = tail
+            return (shb,)
+        else:
+            import shlex
+
+            return tuple(shlex.split(shb))
+
 
 class PythonHandler:
     def __init__(self, min_python=3, max_python=3):
@@ -149,10 +186,13 @@ class PythonHandler:
         if version is None:
             return False
 
-        if version < self.min_python:
+        # Only the major and minor matter, so a patch release is never too new
+        want = version.version[:2]
+
+        if want < self.min_python.version[:2]:
             return False
 
-        if self.max_python is not None and version > self.max_python:
+        if self.max_python is not None and want > self.max_python.version[:2]:
             return False
 
         return True
@@ -164,15 +204,41 @@ class PythonHandler:
         return self.run_command(python_exe, script, get_output=True, **kwargs)
 
     def run_command(self, python_exe, script, get_output=False, **kwargs):
+        import textwrap
+
+        script = textwrap.dedent(script)
+
+        # Short scripts are given straight to python rather than via a file
+        # This stays well under the limit windows has on the length of a command line
+        if len(script) < 8000:
+            question = [
+                str(q) for q in self.with_shebang(python_exe, "-c", script, only_for_windows=True)
+            ]
+            return self.run_question(question, get_output=get_output, **kwargs)
+
+        import tempfile
+
         fle = None
         try:
             fle = tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False)
-            fle.write(textwrap.dedent(script))
+            fle.write(script)
             fle.close()
+            return self.run_file(python_exe, fle.name, get_output=get_output, **kwargs)
+        finally:
+            if fle is not None:
+                try:
+                    os.unlink(fle.name)
+                except FileNotFoundError:
+                    pass
 
-            question = [
-                str(q) for q in self.with_shebang(python_exe, fle.name, only_for_windows=True)
-            ]
+    def run_file(self, python_exe, location, get_output=False, **kwargs):
+        question = [str(q) for q in self.with_shebang(python_exe, location, only_for_windows=True)]
+        return self.run_question(question, get_output=get_output, **kwargs)
+
+    def run_question(self, question, get_output=False, **kwargs):
+        import subprocess
+
+        try:
             if get_output:
                 return (
                     (subprocess.check_output(question, **{"stderr": subprocess.PIPE, **kwargs}))
@@ -186,35 +252,63 @@ class PythonHandler:
             if error.stderr:
                 stde = error.stderr.decode()
             raise errors.FailedToGetOutput(stde, error)
-        finally:
-            location = pathlib.Path(fle.name)
-            if fle is not None and location.exists():
-                location.unlink()
+
+    def which(self, name):
+        import shutil
+
+        key = (name, os.environ.get("PATH"))
+        if key not in found_executables:
+            found_executables[key] = shutil.which(name)
+        return found_executables[key]
 
     def version_for(self, executable, raise_error=False, without_patch=False):
         if executable is None:
             return None, None
 
         try:
-            version_info = self.get_output(
-                executable, 'print(__import__("json").dumps(list(__import__("sys").version_info)))'
-            )
-        except errors.FailedToGetOutput:
+            location = os.path.realpath(executable)
+            key = (location, os.stat(location).st_mtime_ns)
+        except OSError:
+            key = None
+
+        version_info = found_versions.get(key)
+        if version_info is None:
+            try:
+                version_info = self.get_output(executable, version_question)
+            except errors.FailedToGetOutput as error:
+                version_info = error
+            else:
+                if version_info:
+                    version_info = version_info.split("\n")[-1]
+
+            if key is not None:
+                found_versions[key] = version_info
+
+        if isinstance(version_info, errors.FailedToGetOutput):
             if raise_error:
-                raise
+                raise version_info
             return executable, None
 
-        if version_info:
-            version_info = version_info.split("\n")[-1]
-
         try:
-            vers = ".".join(str(part) for part in json.loads(version_info))
-        except (TypeError, ValueError) as error:
+            return executable, Version(version_info, without_patch=without_patch)
+        except errors.InvalidVersion as error:
             raise Exception(
                 f"Failed to figure out python version\nLooking at:\n=====\n{version_info}\n=====\nError: {error}"
             )
-        else:
-            return executable, Version(vers, without_patch=without_patch)
+
+    def versions_for(self, executor, executables, without_patch=False):
+        # Each python is asked at the same time, and only once for each real location
+        # Errors from asking a python are only raised when its future is used
+        futures = {}
+        result = []
+        for executable in executables:
+            location = None if executable is None else os.path.realpath(executable)
+            if location not in futures:
+                futures[location] = executor.submit(
+                    self.version_for, executable, without_patch=without_patch
+                )
+            result.append(futures[location])
+        return result
 
     def versions(self, starting):
         version = starting
@@ -235,6 +329,8 @@ class PythonHandler:
             else:
                 version = Version((version.major, version.minor - 1))
 
+        # These are still tried when a max is specified because some installations
+        # of python, like on windows, only provide python.exe
         version = starting
         while version >= self.min_python:
             yield "python{0}".format(*version.version)
@@ -252,26 +348,40 @@ class PythonHandler:
             if self.suitable(version):
                 return sys.executable
 
-        max_python = self.min_python
-        if self.max_python is None:
-            _, max_python_1 = self.version_for(shutil.which("python3"), without_patch=True)
-            _, max_python_2 = self.version_for(shutil.which("python"), without_patch=True)
-            found = [
-                m for m in (max_python_1, max_python_2) if m is not None and m > self.min_python
-            ]
-            if len(found) > 1:
-                max_python = max([max_python_1, max_python_2])
-            elif len(found) == 1:
-                max_python = found[0]
-        else:
-            max_python = self.max_python
-
-        tried = []
-        for version in self.versions(max_python):
-            tried.append(version)
-            executable, found = self.version_for(shutil.which(version), without_patch=True)
-            if self.suitable(found):
-                return executable
+        from concurrent.futures import ThreadPoolExecutor
+
+        executor = ThreadPoolExecutor(max_workers=4)
+        try:
+            max_python = self.min_python
+            if self.max_python is None:
+                (_, max_python_1), (_, max_python_2) = [
+                    future.result()
+                    for future in self.versions_for(
+                        executor, [self.which("python3"), self.which("python")], without_patch=True
+                    )
+                ]
+                found = [
+                    m for m in (max_python_1, max_python_2) if m is not None and m > self.min_python
+                ]
+                if len(found) > 1:
+                    max_python = max([max_python_1, max_python_2])
+                elif len(found) == 1:
+                    max_python = found[0]
+            else:
+                max_python = self.max_python
+
+            tried = list(self.versions(max_python))
+            executables = [self.which(version) for version in tried]
+
+            # Every candidate is asked at once, but they are still used in order
+            futures = self.versions_for(executor, executables, without_patch=True)
+            for executable, future in zip(executables, futures):
+                _, found = future.result()
+                if self.suitable(found):
+                    return executable
+        finally:
+            # There's no need to wait for answers that won't be used
+            executor.shutdown(wait=False)
 
         raise Exception(
             "\n".join(
@@ -1,31 +1,41 @@
+def pip_install(*args):
+    import subprocess
+    import sys
+
+    subprocess.run([sys.executable, "-m", "pip", "install", *args], check=True)
+
+
 def ensure_packaging_module(packaging_version):
     import importlib
-    import os
     import sys
 
+    if not any(str(packaging_version).startswith(ch) for ch in ("=", ">", "<")):
+        packaging_version = f"=={packaging_version}"
+
     try:
-        __import__("packaging")
+        import packaging
     except ImportError:
-        os.system(f"{sys.executable} -m pip install packaging")
+        pass
+    else:
+        from packaging.specifiers import SpecifierSet
 
-    import packaging
-    from packaging.specifiers import SpecifierSet
+        if packaging.__version__ in SpecifierSet(packaging_version):
+            return packaging
 
-    if not any(str(packaging_version).startswith(ch) for ch in ("=", ">", "<")):
-        packaging_version = f"=={packaging_version}"
+    pip_install(f"packaging{packaging_version}")
 
-    specifier = SpecifierSet(packaging_version)
+    # Forget the old version entirely so its submodules aren't mixed with the new one
+    for name in list(sys.modules):
+        if name == "packaging" or name.startswith("packaging."):
+            del sys.modules[name]
+    importlib.invalidate_caches()
 
-    if packaging.__version__ not in specifier:
-        os.system(f"{sys.executable} -m pip install 'packaging{specifier}'")
-        importlib.reload(packaging)
-        return __import__("packaging")
-    else:
-        return packaging
+    return __import__("packaging")
 
 
 def determine_if_needs_installation(deps, no_binary, packaging_version):
-    import importlib
+    import importlib.util
+    import json
     import sys
 
     def with_pkg_resources():
@@ -34,13 +44,10 @@ def determine_if_needs_installation(deps, no_binary, packaging_version):
         try:
             pkg_resources.working_set.require(deps)
         except (pkg_resources.DistributionNotFound, pkg_resources.VersionConflict) as error:
-            sys.stderr.write(str(error) + "\\n\\n")
-            sys.stderr.flush()
-            raise SystemExit(1)
+            return str(error)
 
     def with_importlib_metadata():
-        import sys
-        from collections import defaultdict
+        from collections import defaultdict, deque
         from importlib.metadata import PackageNotFoundError, requires, version
 
         ensure_packaging_module(packaging_version)
@@ -48,16 +55,18 @@ def determine_if_needs_installation(deps, no_binary, packaging_version):
 
         need = defaultdict(list)
         have = {}
+        dists = {}
         checked = set()
-        deps_list = list(deps)
+        deps_list = deque((dep, None) for dep in deps)
 
         while deps_list:
-            dep = deps_list.pop(0)
+            dep, req = deps_list.popleft()
             if dep in checked:
                 continue
 
             checked.add(dep)
-            req = Requirement(dep)
+            if req is None:
+                req = Requirement(dep)
 
             if req.marker and not req.marker.evaluate():
                 continue
@@ -75,37 +84,66 @@ def determine_if_needs_installation(deps, no_binary, packaging_version):
                 try:
                     have[req.name] = version(req_name)
                 except PackageNotFoundError as error:
-                    sys.stderr.write(f"{error}\n\n")
-                    sys.stderr.flush()
-                    raise SystemExit(1)
+                    return str(error)
 
-            for tag in ("", *req.extras):
+                # The metadata for each distribution is only read and parsed once
+                dists[req.name] = []
                 for dist_dep in requires(req_name) or []:
                     dist_req = Requirement(dist_dep)
+                    dist_req.extras = set()
+                    dists[req.name].append((str(dist_req), dist_req))
+
+            for tag in ("", *req.extras):
+                for dist_dep, dist_req in dists[req.name]:
                     if dist_req.marker and not dist_req.marker.evaluate({"tag": tag}):
                         continue
-
-                    dist_req.extras = set()
-                    dist_dep = str(dist_req)
-                    deps_list.append(dist_dep)
+                    deps_list.append((dist_dep, dist_req))
 
         for name, specifiers in need.items():
             installed = have[name]
             for specifier in specifiers:
-                if installed not in specifier:
-                    sys.stderr.write(
-                        f"Package {name} needs {specifier} but is installed as {installed}\n\n"
-                    )
-                    sys.stderr.flush()
-                    raise SystemExit(1)
+                if not specifier.contains(installed, prereleases=True):
+                    return f"Package {name} needs {specifier} but is installed as {installed}"
 
     if sys.version_info < (3, 8):
-        with_pkg_resources()
+        err = with_pkg_resources()
     else:
-        with_importlib_metadata()
+        err = with_importlib_metadata()
 
+    rebuild = []
     for name in no_binary:
-        if importlib.import_module(name).__file__.endswith(".so"):
-            sys.stderr.write(f"{name} needs to not be a binary installation\\n\\n")
-            sys.stderr.flush()
-            raise SystemExit(1)
+        # Find where the module is without running it
+        try:
+            spec = importlib.util.find_spec(name)
+        except ImportError:
+            continue
+
+        if spec is not None and spec.origin and spec.origin.endswith(".so"):
+            rebuild.append(name)
+
+    if err is None and rebuild:
+        err = f"{', '.join(rebuild)} needs to not be a binary installation"
+
+    print(json.dumps({"ok": err is None, "rebuild": rebuild, "err": err or ""}))
+
+
+if __name__ == "__main__":
+    import json
+    import os
+    import sys
+
+    # Make sure the modules next to this file don't shadow what is in the virtualenv
+    # That directory isn't on sys.path when python is run with -P or PYTHONSAFEPATH
+    here = os.path.dirname(os.path.realpath(__file__))
+    if sys.path and os.path.realpath(sys.path[0]) == here:
+        sys.path.pop(0)
+
+    # Either one set of options or a list of them, with a line of output for each
+    options = json.load(sys.stdin)
+    if isinstance(options, dict):
+        options = [options]
+
+    for option in options:
+        determine_if_needs_installation(
+            option["deps"], option["no_binary"], option["packaging_version"]
+        )
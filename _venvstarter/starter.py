@@ -1,17 +1,52 @@
-import inspect
+import hashlib
 import json
 import os
-import shlex
-import shutil
-import subprocess
 import sys
-import tempfile
 from pathlib import Path
 from urllib.parse import urlparse
 
 from . import errors
 from . import helpers as hp
-from . import python_handler, questions
+from . import python_handler
+
+# questions.py is run by the python in the virtualenv, so it doesn't need to be imported here
+questions_location = os.path.join(os.path.dirname(os.path.abspath(__file__)), "questions.py")
+
+# ensure_ascii stays on because the probe reads stdin with the locale's encoding
+compact_json = json.JSONEncoder(separators=(",", ":"))
+
+
+def requirement_for(dep):
+    """
+    Return a requirement that can be checked against what is installed for
+    this line from a requirements file
+    """
+    original_dep = dep
+    name = None
+
+    if "@" in dep:
+        name, dep = dep.split("@")
+        name = name.strip()
+        dep = dep.strip()
+
+    if "#" in dep:
+        if "egg" in dep:
+            dep = dict(arg.split("=", 1) for arg in dep.split("#", 1)[1].split("&"))["egg"]
+        else:
+            parsed = urlparse(dep)
+            version_specifier = parsed.query
+            if "?" in parsed.query:
+                version_specifier = parsed.query.split("?")[0]
+
+            if parsed.fragment and not name:
+                name = parsed.fragment
+
+            if not name:
+                raise ValueError(f"Couldn't determine dependency name from {original_dep}")
+
+            dep = f"{name}{version_specifier}"
+
+    return dep
 
 
 class Starter(object):
@@ -49,6 +84,11 @@ class Starter(object):
         the dependency has already been installed as a binary and reinstall it
         to be installed from source.
 
+    pinned
+        When True, the deps are installed with ``--no-deps`` so that pip doesn't
+        need to resolve dependencies. This means deps must include every
+        dependency that is needed, including transitive dependencies.
+
     env
         An optional dictionary of environment variables to add to the environment
         that the program is run in.
@@ -106,6 +146,11 @@ class Starter(object):
         are correct. This increases startup time at the cost of potentially
         having the wrong versions of dependencies in the virtualenv.
 
+    VENV_STARTER_CHECK_DEPS=1
+        This will make the class always check the dependencies in the virtualenv
+        even if they were already found to be correct for the same requirements
+        and the same python in the virtualenv.
+
     VENVSTARTER_UPGRADE_PIP=0
         This will make sure that pip is not ensured to be greater than 23 before
         requirements are installed
@@ -122,9 +167,11 @@ class Starter(object):
         min_python_version=None,
         max_python_version=None,
         packaging_version="23.2",
+        pinned=False,
     ):
         self.env = env
         self.deps = deps
+        self.pinned = pinned
         self.program = program
         self.no_binary = no_binary
         self.venv_folder = venv_folder
@@ -133,6 +180,15 @@ class Starter(object):
         self.min_python_version = min_python_version
         self.max_python_version = max_python_version
 
+        self._venv_scripts = {}
+
+        # env may be one dictionary or a list of (here, dictionary)
+        self._env_pairs = []
+        if isinstance(self.env, dict):
+            self._env_pairs = [(None, self.env)]
+        elif self.env is not None:
+            self._env_pairs = list(self.env)
+
         if self.no_binary is None:
             self.no_binary = []
 
@@ -142,9 +198,11 @@ class Starter(object):
         if self.min_python_version is None:
             self.min_python_version = 3.7
 
-        handler = python_handler.PythonHandler(self.min_python_version, self.max_python_version)
-        self.min_python = handler.min_python
-        self.max_python = handler.max_python
+        self.python_handler = python_handler.PythonHandler(
+            self.min_python_version, self.max_python_version
+        )
+        self.min_python = self.python_handler.min_python
+        self.max_python = self.python_handler.max_python
 
         if self.max_python is not None and self.min_python > self.max_python:
             raise Exception("min_python_version must be less than max_python_version")
@@ -163,19 +221,30 @@ class Starter(object):
 
         return (Path(folder) / self.venv_folder_name).absolute()
 
-    def venv_script(self, name, default=None):
+    @hp.memoized_property
+    def venv_bin(self):
         if os.name == "nt":
-            location = self.venv_location / "Scripts" / name
+            return self.venv_location / "Scripts"
         else:
-            location = self.venv_location / "bin" / name
+            return self.venv_location / "bin"
 
-        if location.exists():
-            return location
+    def venv_script(self, name, default=None):
+        if name in self._venv_scripts:
+            return self._venv_scripts[name]
 
-        if os.name == "nt":
+        location = self.venv_bin / name
+
+        found = None
+        if location.exists():
+            found = location
+        elif os.name == "nt":
             exe = location.with_suffix(".exe")
             if exe.exists():
-                return exe
+                found = exe
+
+        if found is not None:
+            self._venv_scripts[name] = found
+            return found
 
         if default is not None:
             return default
@@ -186,30 +255,54 @@ class Starter(object):
     def venv_python(self):
         return self.venv_script("python")
 
+    def venv_python_version(self):
+        try:
+            location = os.path.realpath(self.venv_python)
+            fingerprint = f"{location}:{os.stat(location).st_mtime_ns}"
+        except errors.ScriptNotFound:
+            return None
+        except OSError:
+            fingerprint = None
+
+        # Remember the version against the interpreter so warm starts don't need to ask it
+        stamp = self.venv_location / ".venvstarter_pyver"
+        if fingerprint is not None and stamp.exists():
+            recorded, _, version = stamp.read_text().strip().rpartition("\n")
+            if recorded == fingerprint:
+                try:
+                    return python_handler.Version(version)
+                except errors.InvalidVersion:
+                    pass
+
+        _, version_info = self.python_handler.version_for(self.venv_python)
+        if version_info is not None and fingerprint is not None:
+            self.write_stamp(".venvstarter_pyver", f"{fingerprint}\n{version_info}")
+        return version_info
+
     def make_virtualenv(self):
         python_exe = None
         if self.venv_location.exists():
-            finder = python_handler.PythonHandler(self.min_python, self.max_python)
+            finder = self.python_handler
 
-            try:
-                _, version_info = finder.version_for(self.venv_python)
-            except errors.ScriptNotFound:
-                version_info = None
+            version_info = self.venv_python_version()
 
             if not finder.suitable(version_info):
                 # Make sure we can find a suitable python before we remove existing venv
                 try:
-                    finder.find()
+                    python_exe = finder.find()
                 except Exception as error:
                     raise Exception(
                         f"The current virtualenv has a python that's too old. But can't find a suitable replacement: {error}"
                     )
                 else:
+                    import shutil
+
                     shutil.rmtree(self.venv_location)
+                    self._venv_scripts.clear()
 
         if not self.venv_location.exists():
             if python_exe is None:
-                python_exe = python_handler.PythonHandler(self.min_python, self.max_python).find()
+                python_exe = self.python_handler.find()
 
             print("Creating virtualenv", file=sys.stderr)
             print(f"Destination: {self.venv_location}", file=sys.stderr)
@@ -218,7 +311,7 @@ class Starter(object):
 
             with_pip = os.name != "nt"
 
-            python_handler.PythonHandler().run_command(
+            self.python_handler.run_command(
                 python_exe,
                 f"""
             import venv
@@ -227,119 +320,167 @@ class Starter(object):
             )
 
             if not with_pip:
+                import subprocess
+
                 subprocess.run([str(self.venv_python), "-m", "ensurepip"], check=True)
 
             return True
 
-    def check_deps(self, deps=None, check_no_binary=True):
-        deps_to_use = []
-        deps = self.deps if deps is None else deps
+    def deps_fingerprint(self):
+        fingerprint = compact_json.encode(
+            {
+                "deps": sorted(self.deps),
+                "no_binary": sorted(self.no_binary),
+                "packaging_version": str(self.packaging_version),
+                "pinned": self.pinned,
+                "py_mtime": self.venv_python.stat().st_mtime_ns,
+                "site_packages_mtime": self.site_packages_mtime(),
+            }
+        )
+        return hashlib.sha256(fingerprint.encode()).hexdigest()
 
-        for dep in deps:
-            original_dep = dep
-            name = None
+    def site_packages_mtime(self):
+        # Installing or removing a package adds or removes entries in site-packages
+        if os.name == "nt":
+            found = list((self.venv_location / "Lib").glob("site-packages"))
+        else:
+            found = sorted((self.venv_location / "lib").glob("python*/site-packages"))
 
-            if "@" in dep:
-                name, dep = dep.split("@")
-                name = name.strip()
-                dep = dep.strip()
+        return [location.stat().st_mtime_ns for location in found]
 
-            if "#" in dep:
-                if "egg" in dep:
-                    dep = dict(arg.split("=", 1) for arg in dep.split("#", 1)[1].split("&"))["egg"]
-                else:
-                    parsed = urlparse(dep)
-                    version_specifier = parsed.query
-                    if "?" in parsed.query:
-                        version_specifier = parsed.query.split("?")[0]
+    def pip_fingerprint(self):
+        return str(self.venv_python.stat().st_mtime_ns)
 
-                    if parsed.fragment and not name:
-                        name = parsed.fragment
+    def stamp_matches(self, name, value):
+        if os.environ.get("VENV_STARTER_CHECK_DEPS") == "1":
+            return False
 
-                    if not name:
-                        raise ValueError(f"Couldn't determine dependency name from {original_dep}")
+        location = self.venv_location / name
+        if not location.exists():
+            return False
 
-                    dep = f"{name}{version_specifier}"
+        return location.read_text().strip() == value
 
-            deps_to_use.append(dep)
+    def write_stamp(self, name, value):
+        location = self.venv_location / name
+        tmp = location.with_name(f"{location.name}.{os.getpid()}.tmp")
 
-        no_binary = []
-        if check_no_binary:
-            no_binary = self.no_binary
+        # The stamp only saves work on the next run, so not being able to write it
+        # just means that work is done again
+        try:
+            tmp.write_text(value)
+            os.replace(tmp, location)
+        except OSError:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
 
-        handler = python_handler.PythonHandler()
-        question = "\n".join(
-            [
-                inspect.getsource(questions.determine_if_needs_installation),
-                inspect.getsource(questions.ensure_packaging_module),
-                f"\ndetermine_if_needs_installation({json.dumps(deps_to_use)}, {json.dumps(no_binary)}, {self.packaging_version})",
-            ]
-        )
-        return handler.run_command(self.venv_python, question, check=False).returncode
+    @hp.memoized_property
+    def requirements(self):
+        return [requirement_for(dep) for dep in self.deps]
 
-    def find_deps_to_be_made_not_binary(self):
-        handler = python_handler.PythonHandler()
-        question = """
-            import importlib
+    def check_deps(self, deps=None, check_no_binary=True):
+        return self.check_many([(deps, check_no_binary)])[0]
 
-            for name in {0}:
-                try:
-                    if importlib.import_module(name).__file__.endswith(".so"):
-                        print(name)
-                except ImportError:
-                    pass
-            """.format(
-            json.dumps(self.no_binary)
-        )
-        found = handler.run_command(self.venv_python, question, get_output=True).split("\n")
-        return [shlex.quote(name.strip()) for name in found if name.strip()]
+    def check_many(self, checks):
+        options = []
+        for deps, check_no_binary in checks:
+            if deps is None:
+                deps_to_use = self.requirements
+            else:
+                deps_to_use = [requirement_for(dep) for dep in deps]
+
+            no_binary = []
+            if check_no_binary:
+                no_binary = self.no_binary
+
+            options.append(
+                {
+                    "deps": deps_to_use,
+                    "no_binary": no_binary,
+                    "packaging_version": str(self.packaging_version),
+                }
+            )
 
-    def install_deps(self, deps=None, check_no_binary=True):
-        if deps is None:
-            deps = self.deps
+        try:
+            output = self.python_handler.run_file(
+                self.venv_python,
+                questions_location,
+                get_output=True,
+                input=compact_json.encode(options).encode(),
+            )
+        except errors.FailedToGetOutput as error:
+            return [{"ok": False, "rebuild": [], "err": str(error)} for _ in options]
 
-        # Fix a bug whereby the virtualenv has the wrong sys.executable
-        env = dict(os.environ)
-        if "__PYVENV_LAUNCHER__" in env:
-            del env["__PYVENV_LAUNCHER__"]
+        # Installing packaging may have also printed to stdout
+        return [json.loads(line) for line in output.split("\n")[-len(options) :]]
+
+    def install_deps(self, deps=None, check_no_binary=True, result=None):
+        # Only the configured deps are remembered between runs
+        remember = deps is None and check_no_binary
+        if remember and self.stamp_matches(".venvstarter_deps.sha256", self.deps_fingerprint()):
+            return
+
+        if result is None:
+            result = self.check_deps(deps=deps, check_no_binary=check_no_binary)
+        if not result["ok"]:
+            env = os.environ.copy()
+
+            # Fix a bug whereby the virtualenv has the wrong sys.executable
+            if "__PYVENV_LAUNCHER__" in env:
+                del env["__PYVENV_LAUNCHER__"]
+
+            # pip already caches downloads between runs, but there's no need for it
+            # to check pypi for a newer version of itself
+            env.setdefault("PIP_DISABLE_PIP_VERSION_CHECK", "1")
+
+            import subprocess
 
-        ret = self.check_deps(deps=deps, check_no_binary=check_no_binary)
-        if ret != 0:
             ret = 1
             reqs = None
             try:
-                if check_no_binary:
-                    to_remove = self.find_deps_to_be_made_not_binary()
-                    if to_remove:
-                        cmd = [str(self.venv_python), "-m", "pip", "uninstall", "-y", *to_remove]
-                        subprocess.call(cmd, env=env)
+                to_remove = result["rebuild"]
+                if to_remove:
+                    cmd = [str(self.venv_python), "-m", "pip", "uninstall", "-y", *to_remove]
+                    subprocess.call(cmd, env=env)
+
+                import tempfile
 
                 reqs = tempfile.NamedTemporaryFile(
                     delete=False, suffix="venvstarter_requirements", dir="."
                 )
-                for dep in deps:
-                    reqs.write(f"\n{dep}".encode("utf-8"))
-
+                lines = list(self.deps if deps is None else deps)
                 if check_no_binary:
-                    for dep in self.no_binary:
-                        reqs.write(f"\n--no-binary {dep}".encode("utf-8"))
+                    lines.extend(f"--no-binary {dep}" for dep in self.no_binary)
 
+                reqs.write("\n".join(lines).encode("utf-8"))
                 reqs.close()
 
                 cmd = [str(self.venv_python), "-m", "pip", "install", "-r", reqs.name]
+                if remember and self.pinned:
+                    cmd.append("--no-deps")
                 ret = subprocess.call(cmd, env=env)
+
+                # pip may have changed what scripts are in the virtualenv
+                self._venv_scripts.clear()
             finally:
                 if reqs is not None:
-                    reqs_loc = Path(reqs.name)
-                if reqs is not None and reqs_loc.exists():
-                    reqs_loc.unlink()
+                    reqs.close()
+                    try:
+                        os.unlink(reqs.name)
+                    except FileNotFoundError:
+                        pass
 
             if ret != 0:
                 raise SystemExit(1)
 
-            ret = self.check_deps(deps=deps, check_no_binary=check_no_binary)
-            if ret != 0:
-                raise Exception("Couldn't install the requirements")
+            result = self.check_deps(deps=deps, check_no_binary=check_no_binary)
+            if not result["ok"]:
+                raise Exception(f"Couldn't install the requirements: {result['err']}")
+
+        if remember:
+            self.write_stamp(".venvstarter_deps.sha256", self.deps_fingerprint())
 
     def determine_command(self, args):
         program = self.program
@@ -365,38 +506,17 @@ class Starter(object):
             raise Exception(f"Not sure what to do with this program: {program}")
 
     def env_for_program(self):
-        env = dict(os.environ)
-
-        home = Path.home()
-        venv_parent = self.venv_location.parent
-        if self.env is not None:
-            normalised = {}
-
-            ev = self.env
-            if isinstance(ev, dict):
-                ev = [(None, ev)]
-
-            for here, vv in ev:
-                for k, v in vv.items():
-                    if not isinstance(v, (list, tuple)):
-                        normalised[k] = hp.do_format(
-                            v, here=str(here), home=str(home), venv_parent=str(venv_parent)
-                        )
-                    else:
-                        normalised[k] = str(
-                            Path(
-                                *[
-                                    hp.do_format(
-                                        item,
-                                        here=str(here),
-                                        home=str(home),
-                                        venv_parent=str(venv_parent),
-                                    )
-                                    for item in v
-                                ]
-                            )
-                        )
-            env.update(normalised)
+        env = os.environ.copy()
+
+        home = hp.home()
+        venv_parent = str(self.venv_location.parent)
+        for here, vv in self._env_pairs:
+            mapping = {"here": str(here), "home": home, "venv_parent": venv_parent}
+            for k, v in vv.items():
+                if not isinstance(v, (list, tuple)):
+                    env[k] = hp.do_format(v, mapping)
+                else:
+                    env[k] = str(Path(*[hp.do_format(item, mapping) for item in v]))
 
         # Fix a bug whereby the virtualenv has the wrong sys.executable
         if "__PYVENV_LAUNCHER__" in env:
@@ -412,11 +532,13 @@ class Starter(object):
         if cmd is None:
             return
 
-        cmd = [str(q) for q in python_handler.Shebang(*cmd, *(args or ())).produce()]
+        cmd = list(map(os.fspath, python_handler.Shebang(*cmd, *(args or ())).produce()))
 
         env = self.env_for_program()
 
         if os.name == "nt":
+            import subprocess
+
             p = subprocess.run(cmd, env=env)
             sys.exit(p.returncode)
 
@@ -431,10 +553,25 @@ class Starter(object):
 
         made = self.make_virtualenv()
 
-        if os.environ.get("VENVSTARTER_UPGRADE_PIP", None) != "0":
-            self.install_deps(deps=["pip>=24"], check_no_binary=False)
+        # The stamps live in the virtualenv so they go away when the virtualenv is remade
+        upgrade_pip = os.environ.get("VENVSTARTER_UPGRADE_PIP", None) != "0"
+        if upgrade_pip and self.stamp_matches(".pip_ok", self.pip_fingerprint()):
+            upgrade_pip = False
+
+        check_deps = made or os.environ.get("VENV_STARTER_CHECK_DEPS", None) != "0"
+        if check_deps and self.stamp_matches(".venvstarter_deps.sha256", self.deps_fingerprint()):
+            check_deps = False
+
+        # Ask about pip and the deps with one python, pip is still installed first
+        pip_result, deps_result = None, None
+        if upgrade_pip and check_deps:
+            pip_result, deps_result = self.check_many([(["pip>=24"], False), (None, True)])
+
+        if upgrade_pip:
+            self.install_deps(deps=["pip>=24"], check_no_binary=False, result=pip_result)
+            self.write_stamp(".pip_ok", self.pip_fingerprint())
 
-        if made or os.environ.get("VENV_STARTER_CHECK_DEPS", None) != "0":
-            self.install_deps()
+        if check_deps:
+            self.install_deps(result=deps_result)
 
         self.start_program(args)
@@ -1,11 +1,11 @@
 import inspect
 import json
 import os
-import re
 import shutil
 import subprocess
 import sys
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from pathlib import Path
 from textwrap import dedent
@@ -17,15 +17,16 @@ from venvstarter import FailedToGetOutput, PythonHandler
 
 this_dir = Path(__file__).parent
 
-regexes = {"version": re.compile(r"3\.(6|7|8|9|10|11)")}
+known_versions = ("3.6", "3.7", "3.8", "3.9", "3.10", "3.11")
 
 
 class Pythons:
     def __init__(self, locations):
         self.locations = locations
+        self.ordered = sorted(locations)
 
     def __iter__(self):
-        for key in sorted(self.locations):
+        for key in self.ordered:
             yield float(key[len("python") :])
 
     def __getitem__(self, key):
@@ -35,7 +36,7 @@ class Pythons:
             ), f"Can only get a python location using a float or string of 3.7, 3.8, etc. Used {key}"
 
         key = str(key)
-        if not regexes["version"].match(key):
+        if key not in known_versions:
             assert (
                 False
             ), f"Can only get a python location using a float or string of 3.7, 3.8, etc. Used {key}"
@@ -100,10 +101,10 @@ class PythonsFinder:
         else:
             py = venv_location / "bin" / "python"
 
+        # Venvs from TEST_VENVS are reused between sessions and already have pip
         if created:
             subprocess.run([str(py), "-m", "ensurepip"], check=True)
-
-        subprocess.run([str(py), "-m", "pip", "install", "pip>=24", "--upgrade"], check=True)
+            subprocess.run([str(py), "-m", "pip", "install", "pip>=24", "--upgrade"], check=True)
 
         if not py.exists():
             if errors:
@@ -120,22 +121,20 @@ class PythonsFinder:
         return venv_location, py
 
     def ensure_venvstarter(self, python_exe):
-        try:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                PythonHandler().run_command(python_exe, "import venvstarter", cwd=tmpdir)
-        except FailedToGetOutput:
-            subprocess.run(
-                [str(python_exe), "-m", "pip", "install", "-e", str(this_dir.parent)],
-                check=True,
-            )
+        question = "import venvstarter; print(venvstarter.VERSION)"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            try:
+                return PythonHandler().get_output(python_exe, question, cwd=tmpdir)
+            except FailedToGetOutput:
+                subprocess.run(
+                    [str(python_exe), "-m", "pip", "install", "-e", str(this_dir.parent)],
+                    check=True,
+                )
+                return PythonHandler().get_output(python_exe, question, cwd=tmpdir)
 
     def ensure_venvstarter_version(self, python_exe, venv_location, errors):
-
         try:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                vsver = PythonHandler().get_output(
-                    python_exe, "import venvstarter; print(venvstarter.VERSION)", cwd=tmpdir
-                )
+            vsver = self.ensure_venvstarter(python_exe)
         except FailedToGetOutput as error:
             if errors:
                 pytest.exit(f"Failed to ensure venvstarter version is correct: {error}")
@@ -151,25 +150,59 @@ class PythonsFinder:
                     shutil.rmtree(venv_location)
                     return False
 
+        return True
+
+    def fingerprint(self, location):
+        location = location.expanduser()
+        if not location.is_file():
+            return None
+
+        return [str(location), location.stat().st_mtime_ns, __import__("venvstarter").VERSION]
+
+    def find_one(self, pythons, k, remembered):
+        # Skip asking anything of a venv that was fine last time for the same python
+        fingerprint = self.fingerprint(pythons[k])
+        if remembered and fingerprint is not None and remembered["fingerprint"] == fingerprint:
+            py = Path(remembered["venv_python"])
+            if py.exists():
+                return py, fingerprint
+
+        location = self.normalise_python_location(pythons, k)
+
+        py = None
+        for errors in (False, True):
+            result = self.make_venv(location, k, errors)
+            if not result:
+                continue
+
+            venv_location, py = result
+            if self.ensure_venvstarter_version(py, venv_location, errors):
+                break
+
+        assert py is not None and py.exists()
+        return py, fingerprint
+
     def find(self):
         want = set(["python3.7", "python3.8", "python3.9", "python3.10", "python3.11"])
         pythons = self.pythons_json(want)
-        for k in want:
-            location = self.normalise_python_location(pythons, k)
 
-            py = None
-            for errors in (False, True):
-                result = self.make_venv(location, k, errors)
-                if not result:
-                    continue
+        manifest_location = self.made_venvs / "manifest.json"
+        manifest = {}
+        if manifest_location.is_file():
+            with open(manifest_location) as fle:
+                manifest = json.load(fle)
 
-                venv_location, py = result
-                self.ensure_venvstarter(py)
-                if not self.ensure_venvstarter_version(py, venv_location, errors):
-                    continue
+        # Each python has its own virtualenv, so they can all be prepared at the same time
+        with ThreadPoolExecutor(max_workers=len(want)) as executor:
+            found = {k: executor.submit(self.find_one, pythons, k, manifest.get(k)) for k in want}
 
-            assert py is not None and py.exists()
+        for k, future in found.items():
+            py, fingerprint = future.result()
             pythons[k] = py
+            manifest[k] = {"fingerprint": fingerprint, "venv_python": str(py)}
+
+        with open(manifest_location, "w") as fle:
+            json.dump(manifest, fle)
 
         return Pythons(pythons)
 
@@ -222,10 +255,7 @@ class PATH:
             if python is None:
                 link(sys.executable, end="")
 
-            if os.name == "nt":
-                os.environ["PATH"] = ";".join(str(p) for p in paths)
-            else:
-                os.environ["PATH"] = ":".join(str(p) for p in paths)
+            os.environ["PATH"] = os.pathsep.join(str(p) for p in paths)
 
             if mock_sys is not False:
                 with mock.patch.object(sys, "executable", self.pythons[mock_sys]):
@@ -264,13 +294,13 @@ def write_script(func, args="", *, filename, exe=None, prepare_venv=False, decor
             lines.append(script)
             lines.append(f"script({args})")
 
-        fle.write("\n".join(lines))
+        content = "\n".join(lines)
+        fle.write(content)
 
-    with open(filename) as fle:
-        print(file=sys.stderr)
-        print(f">>CONFTEST: {filename}\n{fle.read()}", file=sys.stderr)
-        print("<<CONFTEST", file=sys.stderr)
-        print(file=sys.stderr)
+    print(file=sys.stderr)
+    print(f">>CONFTEST: {filename}\n{content}", file=sys.stderr)
+    print("<<CONFTEST", file=sys.stderr)
+    print(file=sys.stderr)
 
     os.chmod(filename, 0o755)
 
@@ -1,10 +1,23 @@
 # coding: spec
 
+import os
+
 import pytest
 
-from venvstarter import PythonHandler
+from venvstarter import PythonHandler, Version
 
 describe "PythonHandler":
+    describe "suitable":
+        it "ignores the patch of the version":
+            handler = PythonHandler("3.8", "3.10")
+            assert handler.suitable(Version("3.8.0"))
+            assert handler.suitable(Version("3.10.13"))
+            assert handler.suitable(Version("3.10.13", without_patch=True))
+
+            assert not handler.suitable(None)
+            assert not handler.suitable(Version("3.7.17"))
+            assert not handler.suitable(Version("3.11.0"))
+
     describe "finding the right python":
         it "defaults max version to whatever python3, python and sys.executable are":
             with pytest.helpers.PATH.configure(
@@ -67,3 +80,22 @@ describe "PythonHandler":
         it "works when there is only one version":
             with pytest.helpers.PATH.configure(3.8, python3=3.8, python=3.8, mock_sys=3.8):
                 PythonHandler(3.8, 3.8).find() == pytest.helpers.pythons[3.8]
+
+        it "only complains about a broken python when it gets to it", tmp_path, monkeypatch:
+            if os.name == "nt":
+                pytest.skip("Uses shell scripts as pythons")
+
+            for name, output in (
+                ("python3.9", "3.9.1"),
+                ("python3.8", "not a version"),
+                ("python3", "not a version"),
+            ):
+                location = tmp_path / name
+                location.write_text(f"#!/bin/sh\necho '{output}'\n")
+                location.chmod(0o755)
+
+            monkeypatch.setenv("PATH", str(tmp_path))
+            assert PythonHandler("3.8", "3.9").find() == str(tmp_path / "python3.9")
+
+            with pytest.raises(Exception, match="Failed to figure out python version"):
+                PythonHandler("3.8", "3.8").find()
@@ -2,6 +2,8 @@
 
 import json
 import os
+import subprocess
+import sys
 import time
 from pathlib import Path
 
@@ -166,6 +168,123 @@ describe "Finding the right version":
             ).split("\n")
             assert output[-1] == "yay"
 
+    it "remembers when the dependencies are correct":
+
+        def script():
+            __import__("venvstarter").manager("python").add_pypi_deps("dict2xml==1.7.0").run()
+
+        with pytest.helpers.make_script(script, prepare_venv=True) as filename:
+            venv_location = filename.parent / ".python"
+            deps_stamp = venv_location / ".venvstarter_deps.sha256"
+            assert deps_stamp.exists()
+
+            pip_stamp = venv_location / ".pip_ok"
+            assert pip_stamp.exists()
+
+            # The stamp is only written when the dependencies were checked
+            before = deps_stamp.read_text()
+            before_mtime = deps_stamp.stat().st_mtime_ns
+            output = pytest.helpers.get_output(filename, "-c", "import dict2xml; print('yay')")
+            assert output == "yay"
+            assert deps_stamp.stat().st_mtime_ns == before_mtime
+
+            def script():
+                __import__("venvstarter").manager("python").add_pypi_deps(
+                    "dict2xml==1.7.1"
+                ).run()
+
+            pytest.helpers.write_script(script, prepare_venv=True, filename=filename)
+            assert deps_stamp.read_text() != before
+
+            output = pytest.helpers.get_output(
+                filename, "-c", "import importlib.metadata as m; print(m.version('dict2xml'))"
+            ).split("\n")
+            assert output[-1] == "1.7.1"
+
+    it "is happy with a pre release that is already installed":
+        version = "import importlib.metadata as m; print(m.version('click'))"
+
+        def script():
+            __import__("venvstarter").manager("python").add_pypi_deps("click==8.0.0rc1").run()
+
+        with pytest.helpers.make_script(script, prepare_venv=True) as filename:
+            output = pytest.helpers.get_output(filename, "-c", version).split("\n")
+            assert output[-1] == "8.0.0rc1"
+
+            def script():
+                __import__("venvstarter").manager("python").add_pypi_deps("click>=7.0").run()
+
+            pytest.helpers.write_script(script, prepare_venv=True, filename=filename)
+            output = pytest.helpers.get_output(filename, "-c", version).split("\n")
+            assert output[-1] == "8.0.0rc1"
+
+    it "still works when the virtualenv can't be written to":
+        if os.name == "nt" or os.geteuid() == 0:
+            pytest.skip("Can't make a directory read only for this user")
+
+        def script():
+            __import__("venvstarter").manager("python").add_pypi_deps("dict2xml==1.7.0").run()
+
+        with pytest.helpers.make_script(script, prepare_venv=True) as filename:
+            venv_location = filename.parent / ".python"
+            deps_stamp = venv_location / ".venvstarter_deps.sha256"
+            deps_stamp.unlink()
+
+            mode = venv_location.stat().st_mode
+            os.chmod(venv_location, 0o555)
+            try:
+                output = pytest.helpers.get_output(filename, "-c", "import dict2xml; print('yay')")
+                assert output == "yay"
+                assert not deps_stamp.exists()
+                assert not list(venv_location.glob("*.tmp"))
+            finally:
+                os.chmod(venv_location, mode)
+
+    it "only installs the listed dependencies when pinned":
+        has_six = "import importlib.util; print(importlib.util.find_spec('six') is not None)"
+
+        def script():
+            __import__("venvstarter").manager("python").add_pypi_deps(
+                "python-dateutil==2.9.0.post0"
+            ).run()
+
+        with pytest.helpers.make_script(script, prepare_venv=True) as filename:
+            output = pytest.helpers.get_output(filename, "-c", has_six).split("\n")
+            assert output[-1] == "True"
+
+        def script():
+            __import__("venvstarter").manager("python").add_pypi_deps(
+                "python-dateutil==2.9.0.post0"
+            ).pinned().run()
+
+        with pytest.helpers.make_script(script) as filename:
+            # six isn't listed, so pip doesn't install it and the check complains
+            p = subprocess.run(
+                [sys.executable, str(filename)],
+                env={**os.environ, "VENVSTARTER_ONLY_MAKE_VENV": "1"},
+                stderr=subprocess.PIPE,
+            )
+            assert p.returncode != 0
+            assert "six" in p.stderr.decode()
+
+            venv_location = filename.parent / ".python"
+            if os.name == "nt":
+                py = venv_location / "Scripts" / "python.exe"
+            else:
+                py = venv_location / "bin" / "python"
+
+            output = subprocess.check_output([str(py), "-c", has_six]).decode().strip()
+            assert output == "False"
+
+        def script():
+            __import__("venvstarter").manager("python").add_pypi_deps(
+                "python-dateutil==2.9.0.post0", "six==1.16.0"
+            ).pinned().run()
+
+        with pytest.helpers.make_script(script, prepare_venv=True) as filename:
+            output = pytest.helpers.get_output(filename, "-c", has_six).split("\n")
+            assert output[-1] == "True"
+
     it "can be used to make sure a dependency isn't binary":
 
         def script():
@@ -1,5 +1,8 @@
 # coding: spec
 
+import pytest
+
+from _venvstarter.errors import InvalidVersion
 from venvstarter import Version
 
 describe "Version":
@@ -17,6 +20,17 @@ describe "Version":
         assert Version((3, 7)).version == (3, 7, 0)
         assert Version((3, 7, 3)).version == (3, 7, 3)
 
+    it "ignores anything after the patch":
+        assert Version("3.12.0rc1").version == (3, 12, 0)
+        assert Version("3.7.13+").version == (3, 7, 13)
+        assert Version("3.7.13.4").version == (3, 7, 13)
+        assert Version("3.7.").version == (3, 7, 0)
+
+    it "complains about versions that aren't numbers":
+        for want in ("", "three", "3.x", ".7"):
+            with pytest.raises(InvalidVersion):
+                Version(want)
+
     it "can be made to ignore the patch":
         assert Version(3, without_patch=True).version == (3, 0, 0)
         assert Version(3.7, without_patch=True).version == (3, 7, 0)